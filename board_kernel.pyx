@@ -0,0 +1,67 @@
+# cython: language_level=3
+"""Precompiled version of game._step_kernel, for running the simulation without Numba's JIT
+start-up cost.  Build it in place next to game.py with:
+
+    cythonize -3 -i board_kernel.pyx
+
+game.py uses it automatically when the compiled module can be imported.
+
+step() is a line-for-line copy of game._step_kernel and must stay one.  Whenever either
+changes, make the same change to the other.  test_kernels.py checks it against the other
+steps once it is built.
+"""
+
+cimport cython
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def step(const unsigned char[:, :, :] prior_rgb, const unsigned char[:, :] prior_alive,
+         unsigned char[:, :, :] out_rgb, unsigned char[:, :] out_alive, int size):
+    """Compute one generation from prior_rgb/prior_alive into out_rgb/out_alive.  The alive
+    arrays are the boards' bool masks viewed as uint8."""
+
+    cdef int row, col, i, j, r, c, num_neighbors
+    cdef int r_total, g_total, b_total
+    cdef unsigned char alive
+
+    # only typed memoryviews and C ints below, so other threads can run meanwhile
+    with nogil:
+        for row in range(size):
+            for col in range(size):
+                num_neighbors = 0
+                for i in range(-1, 2):
+                    for j in range(-1, 2):
+                        r = row + i
+                        c = col + j
+                        if (i != 0 or j != 0) and 0 <= r < size and 0 <= c < size and prior_alive[r, c]:
+                            num_neighbors += 1
+
+                alive = prior_alive[row, col]
+                if not alive and num_neighbors == 3:
+                    r_total = 0
+                    g_total = 0
+                    b_total = 0
+                    for i in range(-1, 2):
+                        for j in range(-1, 2):
+                            r = row + i
+                            c = col + j
+                            if 0 <= r < size and 0 <= c < size and prior_alive[r, c]:
+                                r_total += prior_rgb[r, c, 0]
+                                g_total += prior_rgb[r, c, 1]
+                                b_total += prior_rgb[r, c, 2]
+                    out_alive[row, col] = 1
+                    out_rgb[row, col, 0] = r_total // 3
+                    out_rgb[row, col, 1] = g_total // 3
+                    out_rgb[row, col, 2] = b_total // 3
+                elif alive and (num_neighbors < 2 or num_neighbors > 3):
+                    out_alive[row, col] = 0
+                    out_rgb[row, col, 0] = 0
+                    out_rgb[row, col, 1] = 0
+                    out_rgb[row, col, 2] = 0
+                else:
+                    # no change: a surviving cell keeps its color, a dead cell stays dead
+                    out_alive[row, col] = alive
+                    out_rgb[row, col, 0] = prior_rgb[row, col, 0]
+                    out_rgb[row, col, 1] = prior_rgb[row, col, 1]
+                    out_rgb[row, col, 2] = prior_rgb[row, col, 2]
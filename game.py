@@ -1,29 +1,73 @@
-import copy
+import functools
+import numpy as np
 import pygame
 import pygame_gui
-import random
+import queue
+import threading
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional.  See _step at the bottom of this file for how the update kernel is chosen.
+    njit = None
 
 # Constant for board size.  GUI is optimized for 20.
 SIZE = 20
+# Smallest board size that --gpu will update with torch.  Smaller boards are faster on the CPU.
+GPU_MIN_SIZE = 256
+
+# Width and height of the board area on screen, left of the GUI.  SIZE can be at most this (one pixel per cell).
+BOARD_PIXELS = 680
+# Distance between neighboring cells, and the width of a cell: at the default SIZE, 32 pixel cells with
+# 2 pixel gaps.  Cells too small for a gap are drawn touching.
+_PITCH = BOARD_PIXELS // SIZE
+_CELL_WIDTH = _PITCH - 2 if _PITCH >= 6 else _PITCH
+# Screen position of each row/column of cells
+_CELL_POSITIONS = tuple(i * _PITCH for i in range(SIZE))
+# The cells' rectangles never change, so they are made once (by _cell_rects) and shared.
+_RECTS = None
+
+
+def _cell_rects():
+    """Return a flat tuple of SIZE * SIZE pygame Rectangles, with the rectangle for cell (i, j)
+    at index i * SIZE + j.  These mark where our cells are on screen.  Made on first use, after
+    pygame has started."""
+
+    global _RECTS
+    if _RECTS is None:
+        _RECTS = tuple(pygame.Rect(x, y, _CELL_WIDTH, _CELL_WIDTH) for x in _CELL_POSITIONS for y in _CELL_POSITIONS)
+    return _RECTS
 
 
 class Game:
     """Game handles the core loop (events, updating, and drawing).  Game keeps an instance of a Board
     that is the world the cells "live" in.  All operations that directly modify the world are encapsulated
-    in Board.  Game layout is not flexible; it is optimized for a 20x20 world.
+    in Board.  Game layout is not flexible; it is optimized for a 20x20 world, though cells shrink to fit
+    larger worlds (up to BOARD_PIXELS cells a side).  Passing gpu=True updates the world with torch instead,
+    but only when SIZE is at least GPU_MIN_SIZE.  With the default SIZE of 20 it is ignored, so the gpu flag
+    (main.py --gpu) only does anything after raising SIZE.
     """
 
-    def __init__(self):
+    def __init__(self, gpu=False):
+        # Whether boards are updated with torch
+        self._gpu = gpu and SIZE >= GPU_MIN_SIZE
         # A Board is the cells' world
-        self._board = Board(SIZE)
-        # We will represent a cell with a rectangle from the pygame library.  This function
-        # creates them.
-        self._rects = self.__make_rects__()
+        self._board = Board(SIZE, self._gpu)
+        # Compile the update kernel now, before the window opens, instead of on the first generation
+        self._board.warm_up()
         # Startup pygame
         pygame.init()
+        # We will represent a cell with a rectangle from the pygame library.  They are shared
+        # by every Game.
+        self._rects = _cell_rects()
         # Create a screen
         self._screen = pygame.display.set_mode([1024, 768])
         pygame.display.set_caption('Life')
+        # Cells are drawn one pixel each onto a small surface, which is then scaled up into another
+        self._cell_surf = pygame.Surface((SIZE, SIZE))
+        self._scaled_surf = pygame.Surface((SIZE * _PITCH, SIZE * _PITCH))
+        # White lines for the gaps between cells, drawn over the scaled-up cells (None if cells have no gaps)
+        self._grid_surf = self.__make_grid__() if _CELL_WIDTH < _PITCH else None
         # GUI manager manages buttons, labels, sliders, etc.
         self._manager = pygame_gui.UIManager((1024, 768), "theme.json")
         # Create a play/pause button
@@ -59,14 +103,33 @@ class Game:
         self._generations = 0
         # Default delay in milliseconds (ms)
         self._delay = 250
+        # Once the loop starts, only the simulation thread touches self._board and self._generations.
+        # Other changes to the world are handed to it as functions on this queue (see __send__).
+        self._commands = queue.Queue()
+        # (generation, board colors) of the newest board the simulation thread has published and this
+        # thread hasn't drawn yet, or None.  Older ones are simply overwritten.  Guarded by _latest_lock,
+        # which is only ever held for a moment.
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        # Exception that stopped the simulation thread, if any
+        self._sim_error = None
+        # Board colors to draw
+        self._snapshot = self._board.snapshot()
+        # Set to cut the simulation thread's wait short when it should notice a change right away
+        self._wake = threading.Event()
+        # Whether anything on screen may have changed since the last redraw
+        self._dirty = True
 
     def loop(self):
         """Main simulation loop.  Checks for events and handles them.  Updates world accordingly.  Redraws
-        world.  Starts over if no QUIT event has occurred.  Notice that _delay is a blocking delay; it
-        will make the GUI less responsive.  It shouldn't be too hard to change this, but I didn't really care
-        that much.
+        world.  Starts over if no QUIT event has occurred.  Generations are calculated on a separate
+        simulation thread (see __sim_loop__), so events and drawing keep their 60 frames per second at any
+        speed.  The screen is only redrawn after an event or a new generation.
         """
 
+        # Calculate generations in the background
+        sim_thread = threading.Thread(target=self.__sim_loop__, daemon=True)
+        sim_thread.start()
         # Keep a clock for frame limiting
         clock = pygame.time.Clock()
         # Keep going until this changes; will change when a user clicks the close button.
@@ -75,9 +138,12 @@ class Game:
             time_delta = clock.tick(60)/1000.0
             # Ask pygame for events
             for event in pygame.event.get():
+                # Any input can change the world or the GUI, so redraw after it
+                self._dirty = True
                 # If window close event happens, set _finished to True
                 if event.type == pygame.QUIT:
                     self._finished = True
+                    self._wake.set()
                 # Left mouse click events
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     # Find coordinate of click
@@ -87,7 +153,7 @@ class Game:
                     # If function returned None it means we didn't click a cell
                     if rectangle is not None:
                         # We clicked a cell.  Change its color.
-                        self._board.change_color(i, j)
+                        self.__send__(functools.partial(self.__change_color__, i, j))
                 # Did the user click a button?  If so, figure out which and call the
                 # appropriate function.
                 if event.type == pygame_gui.UI_BUTTON_PRESSED:
@@ -101,54 +167,122 @@ class Game:
                 if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
                     self._speed_label.set_text("Speed: " + str(self._speed_slider.get_current_value()) + "ms")
                     self._delay = int(self._speed_slider.get_current_value())
+                    self._wake.set()
                 # Have the GUI manager handle GUI events
                 self._manager.process_events(event)
 
             # Let the GUI manager know the time change since last frame
             self._manager.update(time_delta)
-            # If we aren't paused, calculate the next generation
-            if self._running:
-                # Cell updates happen in the Board class.  Call it.
-                self._board.update()
-                # Increment generations.
-                self._generations = self._generations + 1
+            # Show the newest board the simulation thread has published, if there is one
+            with self._latest_lock:
+                latest, self._latest = self._latest, None
+            if latest is not None:
+                generations, self._snapshot = latest
                 # Update generations label
-                self._generations_label.set_text("Generations: " + str(self._generations))
-                # Wait to delay.  Not the best method, but eh.
-                pygame.time.wait(self._delay)
-
-            # Fill the screen with white
-            self._screen.fill((255, 255, 255))
-            # Redraw the world
-            self.__draw_board__()
-            # Redraw the GUI elements
-            self._manager.draw_ui(self._screen)
-            # Flip buffers
-            pygame.display.update()
-
-        # Loop is over (user clicked quit).  Shutdown pygame.
+                self._generations_label.set_text("Generations: " + str(generations))
+                self._dirty = True
+            # The simulation thread died; stop and report it below
+            if self._sim_error is not None:
+                self._finished = True
+
+            # Nothing changed since the last frame (e.g. paused with no input), so skip drawing
+            if self._dirty:
+                # Fill the screen with white
+                self._screen.fill((255, 255, 255))
+                # Redraw the world
+                self.__draw_board__()
+                # Redraw the GUI elements
+                self._manager.draw_ui(self._screen)
+                # Flip buffers
+                pygame.display.update()
+                self._dirty = False
+
+        # Loop is over (user clicked quit).  Let the simulation thread finish, then shutdown pygame.
+        sim_thread.join()
         pygame.quit()
+        if self._sim_error is not None:
+            raise RuntimeError("the simulation thread stopped with an error") from self._sim_error
+
+    def __sim_loop__(self):
+        """Simulation thread, which owns the board.  Applies changes sent by __send__ and publishes the
+        result.  Otherwise, while the sim is running, calculates a generation, publishes it to _latest for
+        the main thread, and waits _delay ms; while paused, waits until woken.  Setting _wake (a change
+        sent, quit, play/pause, speed change) ends either wait early.  Stops once _finished is set, or on
+        an error, which is left in _sim_error for the main thread."""
+
+        try:
+            while not self._finished:
+                # Cleared before looking at the state, so a wake-up that arrives after this is never lost
+                self._wake.clear()
+                if self.__apply_commands__():
+                    self.__publish__()
+                elif self._running:
+                    # Cell updates happen in the Board class.  Call it.
+                    self._board.update()
+                    # Increment generations.
+                    self._generations = self._generations + 1
+                    self.__publish__()
+                else:
+                    self._wake.wait()
+                    continue
+                self._wake.wait(self._delay / 1000)
+        except Exception as error:
+            self._sim_error = error
+
+    def __send__(self, command):
+        """Hand a change to the world (a function taking no arguments) to the simulation thread, which
+        runs it between generations."""
+
+        self._commands.put(command)
+        self._wake.set()
+
+    def __apply_commands__(self):
+        """Simulation thread: run every change sent so far.  Returns whether there were any."""
+
+        applied = False
+        try:
+            while True:
+                self._commands.get_nowait()()
+                applied = True
+        except queue.Empty:
+            return applied
+
+    def __publish__(self):
+        """Simulation thread: leave a copy of the board for the main thread to draw."""
+
+        latest = (self._generations, self._board.snapshot())
+        with self._latest_lock:
+            self._latest = latest
+
+    def __change_color__(self, i, j):
+        """Simulation thread: give cell (i, j) a random color."""
+
+        self._board.change_color(i, j)
+
+    def __new_board__(self, density):
+        """Simulation thread: start over with a new world, density of it alive, and zero generations."""
+
+        self._board = Board(SIZE, self._gpu)
+        if density:
+            self._board.randomize(density)
+        self._generations = 0
 
     def reset(self):
         """Set the simulation back to its starting point values (blank world, zero generations)."""
 
-        self._board = Board()
-        self._generations = 0
+        self.__send__(functools.partial(self.__new_board__, 0))
 
     def randomize(self):
         """Create a random world.  Would be neat to expand it to accept values for density of cells,
         but I didn't want to today.  Fill level at about 20% works pretty well."""
 
-        self._board = Board()
-        for i in range(SIZE):
-            for j in range(SIZE):
-                if random.randint(1, 100) <= 20:
-                    self._board.change_color(i, j)
+        self.__send__(functools.partial(self.__new_board__, 0.20))
 
     def toggle(self):
         """Play/pause the sim."""
 
         self._running = not self._running
+        self._wake.set()
         if self._running:
             self._play_button.set_text("Running")
         else:
@@ -157,110 +291,291 @@ class Game:
     def __select_rectangle__(self, coords: [int, int]) -> (int, int, pygame.Rect):
         """Given a set of coordinates, determine if they lie in one of our rectangles
         that represent our cells.  If so, return coordinates and the rectangle.  Otherwise
-        return a triple of None."""
+        return a triple of None.  Cells sit on a fixed _PITCH pixel pitch, so the cell is found by
+        division instead of testing every rectangle."""
 
-        for i in range(SIZE):
-            for j in range(SIZE):
-                if self._rects[i][j].collidepoint(coords):
-                    return i, j, self._rects[i][j]
+        x, y = coords
+        i, j = x // _PITCH, y // _PITCH
+        if 0 <= i < SIZE and 0 <= j < SIZE and x % _PITCH < _CELL_WIDTH and y % _PITCH < _CELL_WIDTH:
+            return i, j, self._rects[i * SIZE + j]
         return None, None, None
 
-    def __make_rects__(self):
-        """Make and return an SIZE x SIZE list of pygame Rectangles.  These will be
-        used to visually represent our cells."""
+    def __make_grid__(self):
+        """Make and return a transparent surface the size of the board with the gaps between
+        cells filled in white."""
 
-        rectangles = []
-        for i in range(SIZE):
-            rectangles.append([])
-            for j in range(SIZE):
-                rectangles[i].append(pygame.Rect(i * 34, j * 34, 32, 32))
-        return rectangles
+        side = SIZE * _PITCH
+        gap = _PITCH - _CELL_WIDTH
+        grid = pygame.Surface((side, side), pygame.SRCALPHA)
+        grid.fill((0, 0, 0, 0))
+        for k in range(SIZE):
+            grid.fill((255, 255, 255), pygame.Rect(k * _PITCH + _CELL_WIDTH, 0, gap, side))
+            grid.fill((255, 255, 255), pygame.Rect(0, k * _PITCH + _CELL_WIDTH, side, gap))
+        return grid
 
     def __draw_board__(self):
-        """Loop over the board and draw each rectangle with the appropriate color."""
+        """Copy the board colors into the cell surface one pixel per cell, scale it up to the
+        board area, and cover the gaps with the grid."""
 
-        board = self._board.get_board()
-        for i in range(SIZE):
-            for j in range(SIZE):
-                pygame.draw.rect(self._screen, board[i][j], self._rects[i][j])
+        pygame.surfarray.blit_array(self._cell_surf, self._snapshot)
+        pygame.transform.scale(self._cell_surf, self._scaled_surf.get_size(), self._scaled_surf)
+        self._screen.blit(self._scaled_surf, (0, 0))
+        if self._grid_surf is not None:
+            self._screen.blit(self._grid_surf, (0, 0))
 
 
 # Write your code to complete the project below this line.
 class Board:
-    # creates a 2D list (_board)
+    # creates a size x size x 3 array of cell colors (_rgb) and a size x size alive mask (_alive)
     # --> based off of the passed in size in Game class
     # functions:
-    #   get_board: returns board
+    #   get_board: returns board colors
+    #   snapshot: returns a copy of the board colors
+    #   warm_up: runs the update kernel once so its first-call compile happens up front
     #   change_color: changes the color of cell on the board
-    #   count_neighbors: find number of neighbors to see if it changes color
-    #   update: updates the board with new colors
+    #   randomize: gives a random color to a fraction of the cells on the board
+    #   update: updates the board with new colors; neighbor counting and the rules are done
+    #           in one pass over the whole board (__gpu_step__, _step or __bitwise_step__)
 
-    def __init__(self, size=SIZE):
+    def __init__(self, size=SIZE, gpu=False):
         self.size = size
-        self._board = []
-        for row in range(0, size):
-            new_list = []
-            for col in range(0, size):
-                new_list.append((0, 0, 0))
-            self._board.append(new_list)
-        self._prior = copy.deepcopy(self._board)
-        print(self._board)
+        # update with torch (on the GPU when there is one); meant for large boards
+        self._gpu = gpu
+        # cell colors live in one uint8 array, with a parallel mask of which cells are alive
+        self._rgb = np.zeros((size, size, 3), dtype=np.uint8)
+        self._alive = np.zeros((size, size), dtype=bool)
+        self._prior_rgb = self._rgb.copy()
+        self._prior_alive = self._alive.copy()
+        # the board's own random generator; draws whole batches of numbers in one call
+        self._rng = np.random.default_rng()
 
     def get_board(self):
-        return self._board
+        return self._rgb
+
+    def snapshot(self):
+        # a copy of the board colors that later updates won't change
+        return self._rgb.copy()
 
     def change_color(self, row, col):
-        r = random.randint(0, 225)
-        g = random.randint(0, 225)
-        b = random.randint(0, 225)
-        self._board[row][col] = (r, g, b)
-
-    def count_neighbors(self, row, col):
-        num_neighbors = 0
-        r_total = 0
-        g_total = 0
-        b_total = 0
-
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                if row + i in range(0, self.size) and col + j in range(0, self.size):
-                    if self._prior[row + i][col + j] != (0, 0, 0):
-                        num_neighbors += 1
-                        r_total += self._prior[row + i][col + j][0]
-                        g_total += self._prior[row + i][col + j][1]
-                        b_total += self._prior[row + i][col + j][2]
+        self._rgb[row, col] = self._rng.integers(0, 256, size=3, dtype=np.uint8)
+        self._alive[row, col] = True
 
-        if num_neighbors == 0:
-            average_color = (0, 0, 0)
-            return num_neighbors, average_color
-        else:
-            r_avg = r_total / num_neighbors
-            g_avg = g_total / num_neighbors
-            b_avg = b_total / num_neighbors
-            average_color = (r_avg, g_avg, b_avg)
-            return num_neighbors, average_color
+    def randomize(self, density):
+        # every cell comes alive with probability density, all decided in one batch
+        mask = self._rng.random((self.size, self.size)) < density
+        self._rgb[:] = self._rng.integers(0, 256, size=(self.size, self.size, 3), dtype=np.uint8)
+        self._rgb[~mask] = 0
+        self._alive[:] = mask
+
+    def warm_up(self):
+        # run the update kernel once on scratch buffers, so its slow first call (Numba's JIT or
+        # torch.compile) happens now instead of on the first generation
+        if self._gpu:
+            torch, step, device = _torch_step()
+            step(torch.zeros(self.size, self.size, device=device),
+                 torch.zeros(3, self.size, self.size, device=device))
+        elif _step is not None:
+            rgb = np.zeros_like(self._rgb)
+            alive = np.zeros_like(self._alive)
+            _step(rgb, alive.view(np.uint8), rgb.copy(), alive.copy().view(np.uint8), self.size)
 
     def update(self):
-        self._prior = copy.deepcopy(self._board)
-        for row in range(len(self._prior)):
-            for col in range(len(self._prior[row])):
-                num_neighbors, new_color = self.count_neighbors(row, col)
-                if self._prior[row][col] == (0, 0, 0) and num_neighbors == 3:
-                    self._board[row][col] = new_color
-                elif num_neighbors > 3:
-                    self._board[row][col] = (0, 0, 0)
-                elif num_neighbors < 2:
-                    self._board[row][col] = (0, 0, 0)
+        # double-buffered: the current generation becomes the prior one and the old prior
+        # buffers are overwritten with the next generation, so nothing is allocated here
+        self._prior_rgb, self._rgb = self._rgb, self._prior_rgb
+        self._prior_alive, self._alive = self._alive, self._prior_alive
+
+        # these steps must all compute the same generation; see _step_kernel
+        if self._gpu:
+            self.__gpu_step__()
+        elif _step is not None:
+            # the alive masks are passed as uint8 views so the Cython kernel can take them
+            _step(self._prior_rgb, self._prior_alive.view(np.uint8), self._rgb, self._alive.view(np.uint8),
+                  self.size)
+        else:
+            self.__bitwise_step__()
 
         # mutation code for 1% of the time
-        mutation = random.randint(0, 100)
+        mutation = self._rng.integers(0, 101)
         if mutation == 42:
-            # get length of rows and columns, pick a random [row][col] of board to mutate
-            rand_row = random.randint(0, SIZE - 1)
-            rand_col = random.randint(0, SIZE - 1)
-            rand_r = random.randint(0, 225)
-            rand_g = random.randint(0, 225)
-            rand_b = random.randint(0, 225)
-            self._board[rand_row][rand_col] = (rand_r, rand_g, rand_b)
+            # pick a random [row][col] of board to mutate and its new color in one draw
+            rand_row, rand_col, rand_r, rand_g, rand_b = self._rng.integers(0, [self.size, self.size, 256, 256, 256])
+            self._rgb[rand_row, rand_col] = (rand_r, rand_g, rand_b)
+            self._alive[rand_row, rand_col] = True
+
+    def __gpu_step__(self):
+        """Compute the next generation from the prior buffers with torch convolutions, on the GPU when
+        there is one.  The board stays in NumPy arrays, so it is copied over and back every generation;
+        that only pays off for large boards."""
+
+        torch, step, device = _torch_step()
+        alive = torch.from_numpy(self._prior_alive).to(device, torch.float32)
+        rgb = torch.from_numpy(self._prior_rgb).to(device).permute(2, 0, 1).float()
+        next_alive, next_rgb = step(alive, rgb)
+        self._alive[:] = next_alive.bool().cpu().numpy()
+        self._rgb[:] = next_rgb.permute(1, 2, 0).to(torch.uint8).cpu().numpy()
+
+    def __bitwise_step__(self):
+        """Compute the next generation from the prior buffers when there's no compiled kernel.  Whether each
+        cell lives or dies is decided for the whole board at once on a packed bitmap; colors are then
+        only calculated for the cells that were born."""
+
+        alive_bits = _life_bits(_pack_bits(self._prior_alive), self.size)
+        self._alive[:] = _unpack_bits(alive_bits, self.size)
+
+        np.copyto(self._rgb, self._prior_rgb)
+        self._rgb[~self._alive] = 0
+        born = self._alive & ~self._prior_alive
+        for row, col in zip(*np.nonzero(born)):
+            # the cell itself was dead, so the live cells in its 3x3 window are exactly its neighbors
+            window = np.s_[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2]
+            neighbors = self._prior_rgb[window][self._prior_alive[window]]
+            self._rgb[row, col] = neighbors.sum(axis=0) // len(neighbors)
+
+
+# torch is optional and slow to import, so it is only loaded by _torch_step when a GPU board updates.
+_TORCH_STEP = None
+
+
+def _torch_step():
+    """Import torch and compile the torch version of a generation, the first time a GPU board updates.
+    Returns (torch, step, device), where step(alive, rgb) takes a (size, size) float tensor of 0s and 1s
+    and a (3, size, size) float tensor of colors and returns the next generation's pair."""
+
+    global _TORCH_STEP
+    if _TORCH_STEP is None:
+        import torch
+        import torch.nn.functional as F
+
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        # sums the eight neighbors of every cell
+        kernel = torch.ones(1, 1, 3, 3, device=device)
+        kernel[0, 0, 1, 1] = 0
+
+        def step(alive, rgb):
+            num_neighbors = F.conv2d(alive[None, None], kernel, padding=1)[0, 0]
+            rgb_totals = F.conv2d((rgb * alive)[:, None], kernel, padding=1)[:, 0]
+            born = (alive == 0) & (num_neighbors == 3)
+            survive = (alive == 1) & ((num_neighbors == 2) | (num_neighbors == 3))
+            next_alive = (born | survive).float()
+            next_rgb = torch.where(born, torch.div(rgb_totals, 3, rounding_mode='floor'), rgb) * next_alive
+            return next_alive, next_rgb
+
+        _TORCH_STEP = torch, torch.compile(step, mode='reduce-overhead'), device
+    return _TORCH_STEP
+
+
+def _pack_bits(alive):
+    """Pack a (size, size) bool array into one int, with cell (row, col) at bit row * size + col."""
+
+    return int.from_bytes(np.packbits(alive, bitorder='little').tobytes(), 'little')
+
+
+def _unpack_bits(bits, size):
+    """Inverse of _pack_bits: return the (size, size) bool array packed into bits."""
+
+    packed = np.frombuffer(bits.to_bytes((size * size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, count=size * size, bitorder='little').reshape(size, size).astype(bool)
+
+
+@functools.lru_cache()
+def _bit_masks(size):
+    """Return masks for a packed board: every cell, every cell not in the first column, and every
+    cell not in the last column."""
+
+    first_col = sum(1 << (r * size) for r in range(size))
+    everything = (1 << (size * size)) - 1
+    return everything, everything & ~first_col, everything & ~(first_col << (size - 1))
+
+
+def _life_bits(alive, size):
+    """Apply Conway's rules to a whole board packed by _pack_bits and return the next board, packed.
+
+    Each of the eight neighbor directions is a shifted copy of the board.  The copies are added
+    together bit-plane by bit-plane with half adders: b0 holds the ones bit of every cell's neighbor
+    count, b1 the twos bit, b2 the fours bit, and b3 is set for a count of eight.  That counts every
+    cell in a handful of big-integer operations instead of one cell at a time."""
+
+    everything, not_first_col, not_last_col = _bit_masks(size)
+    b0 = b1 = b2 = b3 = 0
+    for i in range(-1, 2):
+        for j in range(-1, 2):
+            if i == 0 and j == 0:
+                continue
+            # bring the neighbor at (row + i, col + j) to each cell's position
+            shift = i * size + j
+            neighbor = alive >> shift if shift > 0 else alive << -shift
+            # drop neighbors that wrapped around from the opposite edge of the board
+            if j == 1:
+                neighbor &= not_last_col
+            elif j == -1:
+                neighbor &= not_first_col
+            neighbor &= everything
+
+            carry = b0 & neighbor
+            b0 ^= neighbor
+            carry2 = b1 & carry
+            b1 ^= carry
+            b3 |= b2 & carry2
+            b2 ^= carry2
+
+    # born with exactly three neighbors, survive with two or three
+    return b1 & ~b2 & ~b3 & (b0 | alive) & everything
+
+
+def _step_kernel(prior_rgb, prior_alive, out_rgb, out_alive, size):
+    """Compute one generation from prior_rgb/prior_alive into out_rgb/out_alive.  Written as
+    plain loops over scalars so Numba can compile it to machine code.  Only births need the
+    neighbors' average color, so colors are summed in a second scan for those cells alone.
+
+    There are four versions of a generation that must give exactly the same board: this one,
+    step() in board_kernel.pyx (a line-for-line copy), Board.__bitwise_step__ and the torch step
+    in _torch_step.  Change them together; test_kernels.py checks each one against __bitwise_step__."""
+
+    for row in range(size):
+        for col in range(size):
+            num_neighbors = 0
+            for i in range(-1, 2):
+                for j in range(-1, 2):
+                    r = row + i
+                    c = col + j
+                    if (i != 0 or j != 0) and 0 <= r < size and 0 <= c < size and prior_alive[r, c]:
+                        num_neighbors += 1
+
+            alive = prior_alive[row, col]
+            if not alive and num_neighbors == 3:
+                r_total = 0
+                g_total = 0
+                b_total = 0
+                for i in range(-1, 2):
+                    for j in range(-1, 2):
+                        r = row + i
+                        c = col + j
+                        if 0 <= r < size and 0 <= c < size and prior_alive[r, c]:
+                            r_total += int(prior_rgb[r, c, 0])
+                            g_total += int(prior_rgb[r, c, 1])
+                            b_total += int(prior_rgb[r, c, 2])
+                out_alive[row, col] = True
+                out_rgb[row, col, 0] = r_total // 3
+                out_rgb[row, col, 1] = g_total // 3
+                out_rgb[row, col, 2] = b_total // 3
+            elif alive and (num_neighbors < 2 or num_neighbors > 3):
+                out_alive[row, col] = False
+                out_rgb[row, col, 0] = 0
+                out_rgb[row, col, 1] = 0
+                out_rgb[row, col, 2] = 0
+            else:
+                # no change: a surviving cell keeps its color, a dead cell stays dead
+                out_alive[row, col] = alive
+                out_rgb[row, col, 0] = prior_rgb[row, col, 0]
+                out_rgb[row, col, 1] = prior_rgb[row, col, 1]
+                out_rgb[row, col, 2] = prior_rgb[row, col, 2]
+
+
+# Prefer the precompiled Cython kernel, which has no start-up cost.  Otherwise use Numba, compiled once
+# and cached on disk so later launches skip the JIT warm-up.  Both release the GIL while they run, so the
+# simulation thread doesn't hold up drawing.  With neither, Board.update uses __bitwise_step__.
+try:
+    from board_kernel import step as _step
+except ImportError:
+    _step = njit(cache=True, nogil=True)(_step_kernel) if njit is not None else None
@@ -1,10 +1,17 @@
-from game import Game
+import argparse
+from game import Game, GPU_MIN_SIZE, SIZE
 
 
 # Create a new Game instance
 # and start the loop
 def main():
-    g = Game()
+    # --gpu updates the world with torch; only used for large worlds
+    parser = argparse.ArgumentParser(description='Life')
+    parser.add_argument('--gpu', action='store_true', help='update large worlds with torch on the GPU')
+    args = parser.parse_args()
+    if args.gpu and SIZE < GPU_MIN_SIZE:
+        parser.error('--gpu needs SIZE of at least %d in game.py (it is %d)' % (GPU_MIN_SIZE, SIZE))
+    g = Game(gpu=args.gpu)
     g.loop()
 
 # Check if this module is being imported or if
@@ -0,0 +1,78 @@
+"""Every way of calculating a generation must give exactly the same board.  Each available step is
+checked against Board.__bitwise_step__ on random boards; Numba, Cython and torch steps are skipped
+when they aren't installed (or, for board_kernel.pyx, built)."""
+
+import numpy as np
+import pytest
+
+import game
+
+
+def _random_board(rng, size):
+    alive = rng.random((size, size)) < 0.4
+    rgb = rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+    rgb[~alive] = 0
+    return rgb, alive
+
+
+def _board_step(rgb, alive, gpu=False):
+    board = game.Board(len(alive), gpu)
+    board._prior_rgb[:] = rgb
+    board._prior_alive[:] = alive
+    if gpu:
+        board.__gpu_step__()
+    else:
+        board.__bitwise_step__()
+    return board._rgb, board._alive
+
+
+def _kernel_step(step):
+    def run(rgb, alive):
+        out_rgb = np.zeros_like(rgb)
+        out_alive = np.zeros_like(alive)
+        step(rgb, alive.view(np.uint8), out_rgb, out_alive.view(np.uint8), len(alive))
+        return out_rgb, out_alive
+    return run
+
+
+def _python():
+    return _kernel_step(game._step_kernel)
+
+
+def _numba():
+    numba = pytest.importorskip('numba')
+    return _kernel_step(numba.njit(game._step_kernel))
+
+
+def _cython():
+    board_kernel = pytest.importorskip('board_kernel')
+    return _kernel_step(board_kernel.step)
+
+
+def _torch():
+    pytest.importorskip('torch')
+    return lambda rgb, alive: _board_step(rgb, alive, gpu=True)
+
+
+@pytest.mark.parametrize('make_step', [_python, _numba, _cython, _torch],
+                         ids=['python', 'numba', 'cython', 'torch'])
+def test_step_matches_bitwise(make_step):
+    step = make_step()
+    rng = np.random.default_rng(0)
+    for size in (1, 2, 3, 7, 20, 33, 64):
+        for _ in range(5):
+            rgb, alive = _random_board(rng, size)
+            expected_rgb, expected_alive = _board_step(rgb, alive)
+            got_rgb, got_alive = step(rgb, alive)
+            np.testing.assert_array_equal(got_alive, expected_alive)
+            np.testing.assert_array_equal(got_rgb, expected_rgb)
+
+
+def test_birth_color_is_average_of_three_neighbors():
+    rgb = np.zeros((3, 3, 3), dtype=np.uint8)
+    alive = np.zeros((3, 3), dtype=bool)
+    rgb[0] = ((200, 200, 200), (200, 200, 200), (201, 10, 0))
+    alive[0] = True
+    new_rgb, new_alive = _board_step(rgb, alive)
+    assert new_alive[1, 1]
+    assert tuple(new_rgb[1, 1]) == (200, 136, 133)